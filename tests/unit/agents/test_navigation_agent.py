@@ -42,3 +42,13 @@ def test_navigation_agent_fallbacks_when_missing_nav(empty_crawl_result) -> None
 
     assert nav.items == []
 
+
+def test_navigation_agent_flattens_anchors_without_lists() -> None:
+    """Given anchors outside any list When processed Then they form a deduplicated flat menu."""
+
+    html = "<html><body><a href='/'>Home</a> <a href='/about'>About</a> <a href='/'>home</a></body></html>"
+    crawl = CrawlResult(pages=[PageContent(url="https://example.com", status_code=200, headers={}, html=html)])
+
+    nav = NavigationAgent().run(crawl)
+
+    assert [(item.label, item.href) for item in nav.items] == [("Home", "/"), ("About", "/about")]
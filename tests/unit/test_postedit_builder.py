@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from webrenewal.postedit.builder import IncrementalBuilder
+from webrenewal.postedit.models import ChangeOperation, ChangeSet, SiteBlock, SitePage, SiteState
+
+
+def _state() -> SiteState:
+    state = SiteState()
+    state.pages = [
+        SitePage(path="/", url="/", title="Home", blocks=[SiteBlock(id="hero", text="Hello world")]),
+        SitePage(path="/services", url="/services", title="Services", blocks=[SiteBlock(id="svc", text="We help")]),
+    ]
+    state.nav["items"] = [{"label": "Home", "href": "index.html"}]
+    return state
+
+
+def _content_change(page: str, block_id: str) -> ChangeSet:
+    return ChangeSet(
+        targets=["content"],
+        operations=[ChangeOperation(type="content.rewrite", payload={}, page=page, block_id=block_id)],
+    )
+
+
+def test_build_skips_render_when_inputs_are_unchanged(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+    first = builder.build(state, ChangeSet(targets=["content"]))
+    assert len(first.changed_files) == 2
+
+    second = builder.build(state, _content_change("/", "hero"))
+
+    assert second.changed_files == []
+    assert sorted(path.name for path in second.unchanged_files) == ["index.html", "services.html"]
+
+
+def test_build_renders_page_when_block_text_changes(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+    builder.build(state, ChangeSet(targets=["content"]))
+
+    state.pages[0].blocks[0].text = "Hello renewed world"
+    result = builder.build(state, _content_change("/", "hero"))
+
+    assert [path.name for path in result.changed_files] == ["index.html"]
+    assert "Hello renewed world" in (result.output_dir / "index.html").read_text(encoding="utf-8")
+
+
+def test_build_escapes_block_text_and_title(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+    state.head["title"] = "Home <script>"
+    state.pages[0].blocks[0].text = "<b>bold</b>"
+
+    result = builder.build(state, ChangeSet(targets=["content"]))
+
+    html = (result.output_dir / "index.html").read_text(encoding="utf-8")
+    assert "<title>Home &lt;script&gt;</title>" in html
+    assert "&lt;b&gt;bold&lt;/b&gt;" in html
+    assert '<nav class="nav"><ul><li><a href="index.html">Home</a></li></ul></nav>' in html
+
+
+def test_build_links_unchanged_pages_to_previous_build(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+    first = builder.build(state, ChangeSet(targets=["content"]))
+
+    second = builder.build(state, ChangeSet(targets=["content"]))
+
+    previous = first.output_dir / "services.html"
+    reused = second.output_dir / "services.html"
+    assert reused in second.unchanged_files
+    assert reused.read_bytes() == previous.read_bytes()
+    assert os.path.samefile(reused, previous)
+
+
+def test_build_never_rewrites_previous_build_for_shared_filenames(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = SiteState()
+    state.pages = [
+        SitePage(path="/about", url="/about", title="About", blocks=[SiteBlock(id="a", text="First")]),
+        SitePage(path="/about.html", url="/about.html", title="About", blocks=[SiteBlock(id="b", text="Second")]),
+    ]
+    first = builder.build(state, ChangeSet(targets=["content"]))
+    published = (first.output_dir / "about.html").read_bytes()
+    assert b"Second" in published
+
+    state.pages[1].blocks[0].text = "Second renewed"
+    second = builder.build(state, _content_change("/about.html", "b"))
+
+    assert (first.output_dir / "about.html").read_bytes() == published
+    assert "Second renewed" in (second.output_dir / "about.html").read_text(encoding="utf-8")
+    assert [path.name for path in second.changed_files] == ["about.html"]
+
+
+def test_build_hashes_streamed_page_bytes(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+
+    result = builder.build(state, ChangeSet(targets=["content"]))
+
+    written = (result.output_dir / "index.html").read_bytes()
+    assert state.pages[0].content_hash == hashlib.sha256(written).hexdigest()
+    assert state.pages[0].rendered is None
+
+
+def test_build_links_css_when_css_operation_is_a_no_op(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+    state.css_bundle["raw"] = "body { color: red; }"
+    css_change = ChangeSet(targets=["css"], operations=[ChangeOperation(type="css.tokens.update", payload={})])
+    first = builder.build(state, css_change)
+
+    second = builder.build(state, css_change)
+
+    assert second.css_path is not None
+    assert os.path.samefile(second.css_path, first.css_path)
+
+
+def test_builds_within_one_second_get_distinct_directories(tmp_path: Path) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+
+    first = builder.build(state, ChangeSet(targets=["content"]))
+    second = builder.build(state, ChangeSet(targets=["content"]))
+
+    assert first.output_dir != second.output_dir
+    assert state.build["latest_dist"] == str(second.output_dir)
+    assert not list(tmp_path.glob(".staging-*"))
+    assert all(path.parent == second.output_dir for path in second.unchanged_files)
+
+
+def test_failed_build_leaves_no_trace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    builder = IncrementalBuilder(tmp_path)
+    state = _state()
+    state.css_bundle["raw"] = "body { color: red; }"
+    css_change = ChangeSet(targets=["css"], operations=[ChangeOperation(type="css.tokens.update", payload={})])
+    first = builder.build(state, css_change)
+    css_hash = state.build["css_hash"]
+
+    state.css_bundle["raw"] = "body { color: blue; }"
+    state.pages[0].blocks[0].text = "Hello renewed world"
+    failing_change = ChangeSet(
+        targets=["css", "content"],
+        operations=[*css_change.operations, *_content_change("/", "hero").operations],
+    )
+    process_page = builder._process_page
+
+    def explode(*args: object) -> bool:
+        # Render first so the page hashes are updated before the build fails.
+        process_page(*args)
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(builder, "_process_page", explode)
+    with pytest.raises(RuntimeError):
+        builder.build(state, failing_change)
+
+    assert state.build["latest_dist"] == str(first.output_dir)
+    assert state.build["css_hash"] == css_hash
+    assert not list(tmp_path.glob(".staging-*"))
+
+    monkeypatch.undo()
+    retry = builder.build(state, _content_change("/", "hero"))
+
+    assert "index.html" in [path.name for path in retry.changed_files]
+    assert "Hello renewed world" in (retry.output_dir / "index.html").read_text(encoding="utf-8")
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import pytest
+
+from webrenewal.postedit import models
+from webrenewal.postedit.models import ChangeOperation, ChangeSet, merge_operations
+
+
+def _change_set() -> ChangeSet:
+    return ChangeSet(
+        targets=["css", "content"],
+        operations=[
+            ChangeOperation(type="css.tokens.update", payload={"tokens": {"palette": {"primary": "#00f"}}}),
+            ChangeOperation(type="content.rewrite", payload={"length": "longer", "notes": ("ü", 1)}, page="/", block_id="hero"),
+        ],
+    )
+
+
+def test_change_set_hash_is_independent_of_json_backend(monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = _change_set().hash()
+
+    monkeypatch.setattr(models, "orjson", None)
+
+    assert _change_set().hash() == expected
+
+
+def test_merge_operations_orders_by_type_page_and_payload() -> None:
+    operations = [
+        ChangeOperation(type="seo.meta.patch", payload={"b": 1}, page="/b"),
+        ChangeOperation(type="seo.meta.patch", payload={"a": 1}, page="/b"),
+        ChangeOperation(type="css.tokens.update", payload={}),
+    ]
+
+    merged = merge_operations(operations)
+
+    assert [op.type for op in merged] == ["css.tokens.update", "seo.meta.patch", "seo.meta.patch"]
+    assert merged[1].payload == {"a": 1}
+
+
+def test_safe_payload_normalises_keys_and_tuples() -> None:
+    payload = {1: ("a", {"b": (2, 3)})}
+
+    assert models.safe_payload(payload) == {"1": ["a", {"b": [2, 3]}]}
+
+
+def test_find_page_tracks_page_list_changes() -> None:
+    state = models.SiteState()
+    home = state.ensure_page("/", url="https://example.com/")
+    assert state.find_page("https://example.com/") is home
+
+    about = models.SitePage(path="/about", url="/about", title="About")
+    state.pages.append(about)
+    assert state.find_page("/about") is about
+
+    about.path = "/team"
+    assert state.find_page("/about") is about  # still matches by url
+    assert state.find_page("/team") is about
+    assert state.ensure_page("/team") is about
+    assert len(state.pages) == 2
+
+    other = models.SitePage(path="/contact", url="/contact", title="Contact")
+    state.pages[0] = other
+    assert state.find_page("/") is None
+    assert state.find_page("https://example.com/") is None
+    assert state.find_page("/contact") is other
+
+    state.pages = [about]
+    assert state.find_page("/contact") is None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 
 import pytest
@@ -53,6 +54,9 @@ def test_postedit_pipeline_updates_css_only(monkeypatch: pytest.MonkeyPatch, san
     # Content should remain unchanged for CSS-only run
     assert updated_state.pages[0].blocks[0].text == "Hello world"
     assert Path(result["build"]["output_dir"]).exists()
+    # Only the agent for the requested scope is ever constructed.
+    assert "theming_agent" in vars(pipeline)
+    assert "rewrite_agent" not in vars(pipeline)
 
 
 def test_postedit_pipeline_is_idempotent(monkeypatch: pytest.MonkeyPatch, sandbox_dir: Path, state_store: StateStore) -> None:
@@ -75,3 +79,73 @@ def test_postedit_pipeline_is_idempotent(monkeypatch: pytest.MonkeyPatch, sandbo
 
     assert first["change_set"] == second["change_set"]
     assert second["preview"]["id"] == state_store.latest_preview()["id"]
+
+
+def test_postedit_pipeline_applies_css_and_content_together(sandbox_dir: Path, state_store: StateStore) -> None:
+    _seed_state(state_store)
+    config = RenewalConfig(
+        domain="https://example.com",
+        css_framework="bootstrap",
+        llm_provider="openai",
+        user_prompt="modern blue buttons and longer content",
+        apply_scope=["css", "content"],
+        no_recrawl=True,
+    )
+
+    PostEditPipeline(config, state_store=state_store).execute()
+
+    updated_state = state_store.load_site_state()
+    assert "style intent" in updated_state.css_bundle.get("raw", "")
+    assert updated_state.pages[0].blocks[0].text != "Hello world"
+
+
+def test_postedit_pipeline_runs_all_scopes(sandbox_dir: Path, state_store: StateStore) -> None:
+    _seed_state(state_store)
+    config = RenewalConfig(
+        domain="https://example.com",
+        css_framework="bootstrap",
+        llm_provider="openai",
+        user_prompt="blue navigation top-right, longer content and better seo keywords",
+        apply_scope=["all"],
+        no_recrawl=True,
+    )
+
+    result = PostEditPipeline(config, state_store=state_store).execute()
+
+    planned = {op["type"].split(".")[0] for op in result["change_set"]["operations"]}
+    handled = planned & {"css", "nav", "content", "seo", "head"}
+    with state_store._connect() as conn:  # Access private helper for verification in tests.
+        row = conn.execute("SELECT diff_stats_json FROM edits LIMIT 1").fetchone()
+    applied = set(json.loads(row["diff_stats_json"])["results"])
+    assert applied == handled
+    assert {"css", "content"} <= applied
+
+
+def test_postedit_pipeline_retry_after_preview_failure_builds_new_preview(
+    monkeypatch: pytest.MonkeyPatch, sandbox_dir: Path, state_store: StateStore
+) -> None:
+    _seed_state(state_store)
+    base = dict(
+        domain="https://example.com",
+        css_framework="bootstrap",
+        llm_provider="openai",
+        apply_scope=["css"],
+        no_recrawl=True,
+    )
+    earlier = PostEditPipeline(RenewalConfig(user_prompt="modern blue", **base), state_store=state_store).execute()
+
+    config = RenewalConfig(user_prompt="warm red rounded buttons", **base)
+    failing = PostEditPipeline(config, state_store=state_store)
+
+    def broken_generate(**kwargs: object) -> None:
+        raise RuntimeError("preview failed")
+
+    monkeypatch.setattr(failing.preview, "generate", broken_generate)
+    with pytest.raises(RuntimeError):
+        failing.execute()
+
+    retried = PostEditPipeline(config, state_store=state_store).execute()
+
+    assert retried["preview"]["id"] != earlier["preview"]["id"]
+    assert Path(retried["preview"]["path"]).exists()
+    assert "changed_files" in retried["build"]
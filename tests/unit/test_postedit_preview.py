@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from webrenewal.postedit import preview
+from webrenewal.postedit.preview import PreviewGenerator
+from webrenewal.state import StateStore
+
+
+def _write(directory: Path, files: dict[str, str]) -> Path:
+    for relative, text in files.items():
+        path = directory / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return directory
+
+
+@pytest.mark.parametrize("use_dmp", [True, False])
+def test_preview_lists_only_changed_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_dmp: bool) -> None:
+    if not use_dmp:
+        monkeypatch.setattr(preview, "diff_match_patch", None)
+    old_dir = _write(tmp_path / "old", {"index.html": "<p>Hello</p>\n", "about.html": "<p>Same</p>\n"})
+    new_dir = _write(tmp_path / "new", {"index.html": "<p>Hello renewed</p>\n", "about.html": "<p>Same</p>\n"})
+
+    result = PreviewGenerator(tmp_path).generate(old_dir=old_dir, new_dir=new_dir)
+
+    html = result.index_path.read_text(encoding="utf-8")
+    assert "<h2>index.html</h2>" in html
+    assert "about.html" not in html
+    assert "renewed" in html
+
+
+def test_preview_reports_identical_builds(tmp_path: Path) -> None:
+    old_dir = _write(tmp_path / "old", {"index.html": "<p>Hello</p>\n"})
+    new_dir = _write(tmp_path / "new", {"index.html": "<p>Hello</p>\n"})
+
+    result = PreviewGenerator(tmp_path).generate(old_dir=old_dir, new_dir=new_dir)
+
+    assert "No differences detected" in result.index_path.read_text(encoding="utf-8")
+
+
+def test_preview_keeps_sorted_order_across_many_files(tmp_path: Path) -> None:
+    names = [f"page-{index}.html" for index in range(6)]
+    old_dir = _write(tmp_path / "old", {name: "old\n" for name in names})
+    new_dir = _write(tmp_path / "new", {name: "new\n" for name in names})
+
+    result = PreviewGenerator(tmp_path).generate(old_dir=old_dir, new_dir=new_dir)
+
+    html = result.index_path.read_text(encoding="utf-8")
+    positions = [html.index(f"<h2>{name}</h2>") for name in names]
+    assert positions == sorted(positions)
+
+
+def test_preview_skips_identical_files_without_reading_them(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    old_dir = _write(tmp_path / "old", {"index.html": "<p>Hello</p>\n"})
+    new_dir = _write(tmp_path / "new", {"index.html": "<p>Hello</p>\n"})
+
+    def fail_read(self: Path, *args: object, **kwargs: object) -> bytes:
+        raise AssertionError(f"unexpected read of {self}")
+
+    monkeypatch.setattr(Path, "read_bytes", fail_read)
+
+    generator = PreviewGenerator(tmp_path)
+    list(generator._diff_directories(old_dir, new_dir))
+
+    assert len(generator._digests) == 2
+
+
+def test_preview_summarises_binary_files(tmp_path: Path) -> None:
+    (tmp_path / "old").mkdir()
+    (tmp_path / "new").mkdir()
+    (tmp_path / "old" / "logo.png").write_bytes(b"\x89PNG\x00old")
+    (tmp_path / "new" / "logo.png").write_bytes(b"\x89PNG\x00newer")
+    (tmp_path / "old" / "data.txt").write_bytes(b"a\x00b")
+    (tmp_path / "new" / "data.txt").write_bytes(b"a\x00c")
+
+    result = PreviewGenerator(tmp_path).generate(old_dir=tmp_path / "old", new_dir=tmp_path / "new")
+
+    html = result.index_path.read_text(encoding="utf-8")
+    assert "Binary file differs (old 8 bytes → new 10 bytes)." in html
+    assert "Binary file differs (old 3 bytes → new 3 bytes)." in html
+
+
+def test_difflib_fallback_only_diffs_the_changed_region(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(preview, "diff_match_patch", None)
+    lines = [f"line {index}" for index in range(100)]
+    changed = list(lines)
+    changed[50] = "line fifty"
+
+    html = preview._diff_one_file("\n".join(lines), "\n".join(changed))
+
+    assert "from line 48" in html
+    assert "line&nbsp;47<" in html
+    assert "line&nbsp;46<" not in html
+    assert "line&nbsp;fifty<" in html
+
+
+def test_diff_match_patch_keeps_only_context_around_changes() -> None:
+    if preview.diff_match_patch is None:
+        pytest.skip("diff-match-patch is not installed")
+    lines = [f"row-{index:03d}" for index in range(100)]
+    changed = list(lines)
+    changed[50] = "row-fifty"
+    changed[90] = "row-ninety"
+
+    html = preview._diff_one_file("\n".join(lines), "\n".join(changed))
+
+    assert "row-047" in html and "row-053" in html
+    assert "row-046" not in html and "row-054" not in html
+    assert "row-000" not in html and "row-099" not in html
+    assert html.count('class="diff-gap"') == 1
+
+
+def test_preview_reuses_stored_manifest_for_unchanged_builds(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store = StateStore(tmp_path / "state.db")
+    old_dir = _write(tmp_path / "old", {"index.html": "<p>Hello</p>\n", "about.html": "<p>Same</p>\n"})
+    new_dir = _write(tmp_path / "new", {"index.html": "<p>Hello renewed</p>\n", "about.html": "<p>Same</p>\n"})
+    PreviewGenerator(tmp_path, state_store=store).generate(old_dir=old_dir, new_dir=new_dir)
+
+    manifest = store.get_dir_manifest(new_dir)
+    assert manifest is not None
+    assert manifest["files"] == ["about.html", "index.html"]
+    assert set(manifest["digests"]) == {"about.html"}
+
+    def fail(directory: Path) -> list[str]:
+        raise AssertionError(f"unexpected rescan of {directory}")
+
+    monkeypatch.setattr(preview, "list_files", fail)
+    result = PreviewGenerator(tmp_path, state_store=store).generate(old_dir=old_dir, new_dir=new_dir)
+
+    assert "<h2>index.html</h2>" in result.index_path.read_text(encoding="utf-8")
+
+
+def test_preview_document_is_wrapped_in_html_shell(tmp_path: Path) -> None:
+    new_dir = _write(tmp_path / "new", {"index.html": "<p>Hello</p>\n"})
+
+    result = PreviewGenerator(tmp_path).generate(old_dir=None, new_dir=new_dir)
+
+    html = result.index_path.read_bytes()
+    assert html.startswith(b"<!DOCTYPE html>\n")
+    assert html.endswith(b"</ul>\n</body>\n</html>\n")
+    assert b"  <li>index.html</li>\n" in html
+
+
+def test_preview_diffs_small_changes_inline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def no_pool(*args: object, **kwargs: object) -> None:
+        raise AssertionError("small previews must not start a process pool")
+
+    monkeypatch.setattr(preview, "ProcessPoolExecutor", no_pool)
+    names = [f"page-{index}.html" for index in range(6)]
+    old_dir = _write(tmp_path / "old", {name: "old\n" for name in names})
+    new_dir = _write(tmp_path / "new", {name: "new\n" for name in names})
+
+    result = PreviewGenerator(tmp_path).generate(old_dir=old_dir, new_dir=new_dir)
+
+    assert all(f"<h2>{name}</h2>" in result.index_path.read_text(encoding="utf-8") for name in names)
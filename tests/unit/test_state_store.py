@@ -1,6 +1,10 @@
 import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 from webrenewal.postedit.models import ChangeOperation, ChangeSet, SiteState
+from webrenewal import state as state_module
 from webrenewal.state import StateStore
 
 
@@ -28,3 +32,106 @@ def test_record_edit_serialises_complex_payload(tmp_path) -> None:
 
     assert diff_payload["results"]["head"]["nav"] == {"items": [], "layout": {}, "html": ""}
     assert llm_payload["path"].endswith("file.txt")
+
+
+def test_site_state_round_trips_through_store(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.db")
+    state = SiteState()
+    state.ensure_page("/", title="Startseite").meta["note"] = "ü"
+    state.seo["meta"]["/"] = {"description": "Beschreibung"}
+    state.ensure_defaults()
+
+    store.save_site_state(state)
+    loaded = store.load_site_state()
+
+    assert loaded.to_dict() == state.to_dict()
+
+
+def test_record_artifact_deduplicates_identical_content(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.db")
+    first = tmp_path / "a.css"
+    second = tmp_path / "b.css"
+    other = tmp_path / "c.css"
+    first.write_text("body{}", encoding="utf-8")
+    second.write_text("body{}", encoding="utf-8")
+    other.write_text("main{}", encoding="utf-8")
+
+    artifact_id = store.record_artifact("css", first)
+
+    assert store.record_artifact("css", second) == artifact_id
+    assert store.record_artifact("css", other) != artifact_id
+    with store._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0] == 2
+
+
+def test_connections_are_reused_per_thread(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.db")
+    main_conn = store._connect()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        worker_conn = pool.submit(store._connect).result()
+
+    assert store._connect() is main_conn
+    assert worker_conn is not main_conn
+    assert main_conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_existing_edits_are_backfilled_with_change_set_hash(tmp_path) -> None:
+    db_path = tmp_path / "state.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE edits (id TEXT PRIMARY KEY, scope TEXT, prompt TEXT, llm_meta_json TEXT,"
+            " diff_stats_json TEXT, created_at TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO edits VALUES ('old', 'css', NULL, '{}', ?, '2024-01-01T00:00:00')",
+            (json.dumps({"change_set_hash": "abc"}),),
+        )
+    conn.close()
+
+    store = StateStore(db_path)
+
+    assert store.has_change_set("abc")
+    assert not store.has_change_set("def")
+    assert store.list_edits()[0].change_set_hash == "abc"
+
+
+def test_bulk_defers_trace_rows_until_exit(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.db")
+
+    def count() -> int:
+        return store._connect().execute("SELECT COUNT(*) FROM trace").fetchone()[0]
+
+    with store.bulk():
+        with store.bulk():
+            for _ in range(3):
+                store.record_trace(
+                    provider="openai", model="m", request_trunc="", response_trunc="", duration_ms=1
+                )
+        assert count() == 0
+
+    assert count() == 3
+
+
+def test_recency_queries_use_created_at_indexes(tmp_path) -> None:
+    store = StateStore(tmp_path / "state.db")
+    conn = store._connect()
+
+    plans = {
+        index: " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+        for index, query in (
+            ("previews_created", "SELECT id FROM previews ORDER BY created_at DESC LIMIT 1"),
+            ("edits_created", "SELECT id FROM edits ORDER BY created_at DESC"),
+        )
+    }
+
+    assert all(index in plan for index, plan in plans.items())
+
+
+def test_iso_now_formats_utc_seconds_and_reuses_string(monkeypatch) -> None:
+    monkeypatch.setattr(state_module.time, "time", lambda: 1_700_000_000.75)
+
+    first = state_module._iso_now()
+
+    assert first == datetime.fromtimestamp(1_700_000_000, timezone.utc).replace(tzinfo=None).isoformat()
+    assert state_module._iso_now() is first
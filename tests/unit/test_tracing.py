@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import json
 import logging
 
 import pytest
 
+from webrenewal import tracing
 from webrenewal.tracing import log_event, safe_json, trace
 
 
@@ -26,7 +28,7 @@ def test_log_event_emits_json(caplog: pytest.LogCaptureFixture) -> None:
         log_event(logger, logging.INFO, "test.event", answer=42)
 
     assert caplog.records
-    assert "\"event\": \"test.event\"" in caplog.text
+    assert json.loads(caplog.records[0].getMessage()) == {"event": "test.event", "answer": 42}
 
 
 def test_trace_context_records_duration(caplog: pytest.LogCaptureFixture) -> None:
@@ -40,4 +42,50 @@ def test_trace_context_records_duration(caplog: pytest.LogCaptureFixture) -> Non
     messages = [record.getMessage() for record in caplog.records]
     assert any("trace.start" in message for message in messages)
     assert any("trace.end" in message for message in messages)
+    end = json.loads(messages[-1])
+    assert isinstance(end["duration_ms"], int) and end["duration_ms"] >= 0
 
+
+def test_trace_child_inherits_parent_fields(caplog: pytest.LogCaptureFixture) -> None:
+    """Given a root span When a child span is opened Then it reuses the logger and parent metadata."""
+
+    logger = logging.getLogger("trace-child-test")
+    with caplog.at_level(logging.INFO):
+        with trace("root", logger=logger, domain="example.com") as root:
+            with root.child("stage", step=1):
+                pass
+
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    child_events = [event for event in events if event["trace"] == "stage"]
+    assert child_events
+    assert all(event["parent"] == "root" for event in child_events)
+    assert all(event["domain"] == "example.com" for event in child_events)
+
+
+def test_log_event_encoding_is_independent_of_json_backend(
+    caplog: pytest.LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Given orjson or the stdlib encoder When logging Then the emitted line is identical."""
+
+    logger = logging.getLogger("test-backend")
+    with caplog.at_level(logging.INFO):
+        log_event(logger, logging.INFO, "test.event", city="Zürich", count=3, nested={"b": 1, "a": [1, 2]})
+        monkeypatch.setattr(tracing, "orjson", None)
+        log_event(logger, logging.INFO, "test.event", city="Zürich", count=3, nested={"b": 1, "a": [1, 2]})
+
+    first, second = (record.getMessage() for record in caplog.records)
+    assert first == second
+
+
+def test_log_event_skips_serialisation_for_disabled_levels(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Given a filtered level When log_event is called Then fields are never serialised."""
+
+    logger = logging.getLogger("test-disabled")
+    logger.setLevel(logging.INFO)
+
+    def fail(value: object) -> object:
+        raise AssertionError("payload should not be built")
+
+    monkeypatch.setattr(tracing, "safe_json", fail)
+
+    log_event(logger, logging.DEBUG, "test.debug", answer=42)
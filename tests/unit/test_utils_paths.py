@@ -25,3 +25,11 @@ def test_url_to_relative_path_handles_extensions() -> None:
 
     assert str(url_to_relative_path("https://example.com/assets/logo.png")) == "assets/logo.png"
 
+
+def test_url_to_relative_path_is_memoised() -> None:
+    """Given a repeated URL When converted twice Then the cached path instance is reused."""
+
+    first = url_to_relative_path("https://example.com/cached/")
+    second = url_to_relative_path("https://example.com/cached/")
+
+    assert first is second
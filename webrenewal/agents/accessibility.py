@@ -4,11 +4,14 @@ from __future__ import annotations
 
 from typing import List
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .base import Agent
 from ..models import A11yReport, CrawlResult, Issue
 
+# Only <img> elements are inspected, so skip building the rest of the tree.
+_IMAGES_ONLY = SoupStrainer("img")
+
 
 class AccessibilityAgent(Agent[CrawlResult, A11yReport]):
     """Run lightweight static accessibility checks."""
@@ -21,7 +24,7 @@ class AccessibilityAgent(Agent[CrawlResult, A11yReport]):
         total_images = 0
         missing_alts = 0
         for page in crawl.pages:
-            soup = BeautifulSoup(page.html, "lxml")
+            soup = BeautifulSoup(page.html, "lxml", parse_only=_IMAGES_ONLY)
             images = soup.find_all("img")
             total_images += len(images)
             for image in images:
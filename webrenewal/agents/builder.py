@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Iterable, List, Mapping, Set
 
@@ -200,7 +201,7 @@ class BuilderAgent(
             section_partials=_SECTION_PARTIALS,
             style_hints=self._style_hints,
         )
-        (output_dir / "index.html").write_text(index_html, encoding="utf-8")
+        rendered: list[tuple[Path, str]] = [(output_dir / "index.html", index_html)]
 
         page_template = self._env.get_template("page.html.jinja")
         for block, filename in page_entries:
@@ -218,7 +219,12 @@ class BuilderAgent(
                 section_partials=_SECTION_PARTIALS,
                 style_hints=self._style_hints,
             )
-            (output_dir / filename).write_text(page_html, encoding="utf-8")
+            rendered.append((output_dir / filename, page_html))
+
+        # Rendering needs the GIL, but the file writes do not; flush all pages
+        # concurrently instead of paying one open/write/close after another.
+        with ThreadPoolExecutor(max_workers=min(32, len(rendered))) as pool:
+            list(pool.map(lambda item: item[0].write_text(item[1], encoding="utf-8"), rendered))
 
         files = list_files(output_dir)
         return BuildArtifact(
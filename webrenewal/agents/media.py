@@ -6,11 +6,14 @@ from typing import List, Optional
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .base import Agent
 from ..models import CrawlResult, MediaInfo, MediaReport
 
+# Only <img> elements are inspected, so skip building the rest of the tree.
+_IMAGES_ONLY = SoupStrainer("img")
+
 
 class MediaAgent(Agent[CrawlResult, MediaReport]):
     """Analyse media elements from crawled pages."""
@@ -27,7 +30,7 @@ class MediaAgent(Agent[CrawlResult, MediaReport]):
     def run(self, crawl: CrawlResult) -> MediaReport:
         images: List[MediaInfo] = []
         for page in crawl.pages:
-            soup = BeautifulSoup(page.html, "lxml")
+            soup = BeautifulSoup(page.html, "lxml", parse_only=_IMAGES_ONLY)
             for img in soup.find_all("img", src=True):
                 src = img["src"].strip()
                 absolute = urljoin(page.url, src)
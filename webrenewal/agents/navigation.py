@@ -20,6 +20,9 @@ class NavigationAgent(Agent[CrawlResult, NavModel]):
 
     def run(self, crawl: CrawlResult) -> NavModel:
         aggregated: List[NavigationItem] = []
+        # Anchors for the flat fallback are gathered from the same parse so no
+        # page has to be parsed a second time when no menu is found.
+        fallback_anchors: List[tuple[str, str]] = []
 
         for page in crawl.pages:
             soup = BeautifulSoup(page.html, "lxml")
@@ -34,8 +37,14 @@ class NavigationAgent(Agent[CrawlResult, NavModel]):
             if nav_structures:
                 self._merge_navigation(aggregated, nav_structures)
 
+            if not aggregated:
+                fallback_anchors.extend(
+                    (anchor.get_text(strip=True), anchor["href"].strip())
+                    for anchor in soup.find_all("a", href=True)
+                )
+
         if not aggregated:
-            aggregated = self._fallback_flat(crawl)
+            aggregated = self._fallback_flat(fallback_anchors)
 
         return NavModel(items=aggregated)
 
@@ -131,18 +140,14 @@ class NavigationAgent(Agent[CrawlResult, NavModel]):
                 existing.append(cloned)
                 lookup[key] = cloned
 
-    def _fallback_flat(self, crawl: CrawlResult) -> List[NavigationItem]:
+    def _fallback_flat(self, anchors: List[tuple[str, str]]) -> List[NavigationItem]:
         items: List[NavigationItem] = []
         seen: set[tuple[str, str]] = set()
-        for page in crawl.pages:
-            soup = BeautifulSoup(page.html, "lxml")
-            for anchor in soup.find_all("a", href=True):
-                label = anchor.get_text(strip=True)
-                href = anchor["href"].strip()
-                key = (label.lower(), href)
-                if label and href and key not in seen:
-                    seen.add(key)
-                    items.append(NavigationItem(label=label, href=href))
+        for label, href in anchors:
+            key = (label.lower(), href)
+            if label and href and key not in seen:
+                seen.add(key)
+                items.append(NavigationItem(label=label, href=href))
         return items
 
 
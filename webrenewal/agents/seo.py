@@ -4,13 +4,17 @@ from __future__ import annotations
 
 from typing import List
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .base import Agent
 from ..models import CrawlResult, Issue, SEOReport
 from ..postedit.models import ChangeOperation, SiteState
 from ..state import StateStore
 
+# The checks only look at <title> and <meta>; parsing just those tags avoids
+# materialising the full document tree for every crawled page.
+_HEAD_TAGS_ONLY = SoupStrainer(["title", "meta"])
+
 
 class SEOAgent(Agent[CrawlResult, SEOReport]):
     """Perform simple SEO quality checks."""
@@ -22,7 +26,7 @@ class SEOAgent(Agent[CrawlResult, SEOReport]):
         issues: List[Issue] = []
         score = 100.0
         for page in crawl.pages:
-            soup = BeautifulSoup(page.html, "lxml")
+            soup = BeautifulSoup(page.html, "lxml", parse_only=_HEAD_TAGS_ONLY)
             title_tag = soup.find("title")
             meta_desc = soup.find("meta", attrs={"name": "description"})
             if not title_tag or not title_tag.text.strip():
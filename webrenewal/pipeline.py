@@ -4,18 +4,19 @@ from __future__ import annotations
 
 import json
 import logging
+from functools import cached_property
 from pathlib import Path
 from typing import Dict, Optional
 
 from . import configure_logging
 from .config import PipelineConfig, load_pipeline_config
 from .delta import DeltaPlanner
-from .postedit.builder import IncrementalBuilder
+from .postedit.builder import BuildResult, IncrementalBuilder
 from .postedit.models import ChangeSet, SiteBlock, SiteState
 from .postedit.preview import PreviewGenerator
 from .state import StateStore, default_state_store
 from .storage import SANDBOX_DIR
-from .tracing import log_event, trace
+from .tracing import TraceSpan, log_event, trace
 from .agents import NavigationBuilderAgent, RewriteAgent, SEOAgent, ThemingAgent
 from .agents.head import HeadAgent
 from .models import RenewalConfig
@@ -39,20 +40,41 @@ class PostEditPipeline:
         SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
         self.state_store = state_store or default_state_store(SANDBOX_DIR)
         self.builder = IncrementalBuilder(SANDBOX_DIR)
-        self.preview = PreviewGenerator(SANDBOX_DIR)
+        self.preview = PreviewGenerator(SANDBOX_DIR, state_store=self.state_store)
         self.resolved_model = config.llm_model or default_model_for(config.llm_provider)
-        self.rewrite_agent = RewriteAgent(model=self.resolved_model, llm_provider=config.llm_provider)
-        self.theming_agent = ThemingAgent(
+
+    # Agents are built on first use so runs that only touch a few scopes do
+    # not pay for constructing the rest.
+    @cached_property
+    def rewrite_agent(self) -> RewriteAgent:
+        return RewriteAgent(model=self.resolved_model, llm_provider=self.config.llm_provider)
+
+    @cached_property
+    def theming_agent(self) -> ThemingAgent:
+        return ThemingAgent(
             design_directives=self.pipeline_config.design_directives,
-            theme_style=config.theme_style,
-            css_framework=config.css_framework,
+            theme_style=self.config.theme_style,
+            css_framework=self.config.css_framework,
         )
-        self.navigation_builder = NavigationBuilderAgent(css_framework=config.css_framework)
-        self.seo_agent = SEOAgent()
-        self.head_agent = HeadAgent()
+
+    @cached_property
+    def navigation_builder(self) -> NavigationBuilderAgent:
+        return NavigationBuilderAgent(css_framework=self.config.css_framework)
+
+    @cached_property
+    def seo_agent(self) -> SEOAgent:
+        return SEOAgent()
+
+    @cached_property
+    def head_agent(self) -> HeadAgent:
+        return HeadAgent()
 
     # ------------------------------------------------------------------
     def execute(self) -> Dict[str, object]:
+        with trace("postedit.pipeline", logger=self.logger, domain=self.config.domain) as root:
+            return self._execute(root)
+
+    def _execute(self, root: TraceSpan) -> Dict[str, object]:
         self._log_configuration()
         site_state = self.state_store.load_site_state()
         site_state.ensure_defaults()
@@ -101,11 +123,15 @@ class PostEditPipeline:
                 "build": build_info,
             }
 
-        with trace("postedit.apply", logger=self.logger, operations=len(change_set.operations)):
+        # Agents may record many LLM traces; write them in one transaction.
+        with (
+            root.child("postedit.apply", operations=len(change_set.operations)),
+            self.state_store.bulk(),
+        ):
             results = self._apply_operations(site_state, change_set)
 
         previous_dir = site_state.build.get("latest_dist")
-        with trace("postedit.build", logger=self.logger):
+        with root.child("postedit.build"):
             build_result = self.builder.build(site_state, change_set)
 
         preview_result = self.preview.generate(
@@ -117,22 +143,10 @@ class PostEditPipeline:
             new_dir=build_result.output_dir,
             index_path=preview_result.index_path,
         )
-
-        self.state_store.save_site_state(site_state)
-        self.state_store.record_edit(
-            scope=",".join(change_set.targets),
-            prompt=self.config.user_prompt,
-            change_set=change_set,
-            diff_stats={
-                "changed_files": [str(path.relative_to(build_result.output_dir)) for path in build_result.changed_files],
-                "unchanged_files": [
-                    str(path.relative_to(build_result.output_dir))
-                    for path in build_result.unchanged_files
-                ],
-                "operations": len(change_set.operations),
-                "results": results,
-            },
-        )
+        # Persist only once the preview is recorded: a stored edit marks the
+        # change set as done, so a failed preview must leave nothing behind
+        # for a retry to trip over.
+        self._persist_edit(site_state, change_set, build_result, results)
 
         log_event(
             self.logger,
@@ -201,6 +215,29 @@ class PostEditPipeline:
 
         return results
 
+    def _persist_edit(
+        self,
+        state: SiteState,
+        change_set: ChangeSet,
+        build_result: BuildResult,
+        results: Dict[str, object],
+    ) -> None:
+        self.state_store.save_site_state(state)
+        self.state_store.record_edit(
+            scope=",".join(change_set.targets),
+            prompt=self.config.user_prompt,
+            change_set=change_set,
+            diff_stats={
+                "changed_files": [str(path.relative_to(build_result.output_dir)) for path in build_result.changed_files],
+                "unchanged_files": [
+                    str(path.relative_to(build_result.output_dir))
+                    for path in build_result.unchanged_files
+                ],
+                "operations": len(change_set.operations),
+                "results": results,
+            },
+        )
+
     def _bootstrap_state(self, state: SiteState) -> None:
         log_event(self.logger, logging.INFO, "pipeline.bootstrap")
         home = state.ensure_page("/", url="/", title="Home")
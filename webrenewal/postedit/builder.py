@@ -3,13 +3,127 @@
 from __future__ import annotations
 
 import hashlib
+import itertools
+import os
 import shutil
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
-from .models import ChangeSet, SiteBlock, SitePage, SiteState
+from jinja2 import DictLoader, Environment
+from markupsafe import Markup
+
+from .models import ChangeSet, SiteBlock, SitePage, SiteState, _canonical_json
+
+# Bump whenever the page markup produced by ``_render_page`` changes so stored
+# input fingerprints from older builds no longer match.
+_RENDER_VERSION = "2"
+
+# Disambiguates builds started by one process within the same second.
+_BUILD_SEQUENCE = itertools.count(1)
+
+
+def _reuse(source: Path, target: Path) -> None:
+    """Reuse ``source`` at ``target`` without copying bytes where possible.
+
+    Build directories are never modified after they are written, so a
+    hardlink to the previous build's file is safe and constant-time. Fall back
+    to a full copy across filesystems or where hardlinks are unsupported.
+    """
+
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _block_heading(block: SiteBlock) -> str:
+    return block.meta.get("heading") or block.id.replace("-", " ").title()
+
+
+_TEMPLATES = {
+    "block.html": (
+        '    <section id="{{ block.id }}" class="block-{{ block.type }}">\n'
+        "      <h2>{{ block_heading(block) }}</h2>\n"
+        "      <p>{{ block.text }}</p>\n"
+        "      {% if block.meta.get('call_to_action') %}"
+        '<p class="cta">{{ block.meta["call_to_action"] }}</p>'
+        "{% endif %}\n"
+        "    </section>"
+    ),
+    "nav.html": (
+        '<nav class="{{ classes }}"><ul>'
+        "{% for item in items %}"
+        "<li><a href=\"{{ item.get('href', '#') }}\">{{ item.get('label', 'Item') }}</a></li>"
+        "{% endfor %}"
+        "</ul></nav>"
+    ),
+    "page.html": (
+        "<!DOCTYPE html>\n"
+        '<html lang="en">\n'
+        "<head>\n"
+        '  <meta charset="utf-8"/>\n'
+        "  <title>{{ title }}</title>\n"
+        "  {% if seo_meta %}"
+        '<meta name="description" content="{{ seo_meta.get(\'description\', \'\') }}" />'
+        "{% endif %}\n"
+        '  <link rel="stylesheet" href="assets/css/main.css"/>\n'
+        "  {% for link in head_links %}"
+        '<link rel="{{ link.get(\'rel\', \'stylesheet\') }}" href="{{ link.get(\'href\', \'\') }}">'
+        "{% if not loop.last %}\n{% endif %}"
+        "{% endfor %}\n"
+        "</head>\n"
+        "<body>\n"
+        "  <header>{{ nav_html }}</header>\n"
+        "  <main>\n"
+        "{% for block in blocks %}"
+        '{% include "block.html" %}'
+        "{% if not loop.last %}\n{% endif %}"
+        "{% endfor %}\n"
+        "  </main>\n"
+        '  <footer class="site-footer">Generated by Post-Edit Builder</footer>\n'
+        "</body>\n"
+        "</html>\n"
+    ),
+}
+
+# Compiled once at import; autoescaping keeps titles, block text and attribute
+# values from injecting markup into the generated pages.
+_ENV = Environment(
+    loader=DictLoader(_TEMPLATES),
+    autoescape=True,
+    auto_reload=False,
+    keep_trailing_newline=True,
+)
+_ENV.globals["block_heading"] = _block_heading
+_PAGE_TEMPLATE = _ENV.get_template("page.html")
+_NAV_TEMPLATE = _ENV.get_template("nav.html")
+
+
+class _HashingWriter:
+    """Text sink that writes UTF-8 to ``stream`` while hashing the same bytes."""
+
+    __slots__ = ("_stream", "_digest")
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream = stream
+        self._digest = hashlib.sha256()
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self._digest.update(data)
+        self._stream.write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+# (page, target, input fingerprint, previous file to reuse or ``None`` to render)
+_PagePlan = Tuple[SitePage, Path, str, Optional[Path]]
 
 
 @dataclass(slots=True)
@@ -30,8 +144,54 @@ class IncrementalBuilder:
 
     def build(self, state: SiteState, change_set: ChangeSet) -> BuildResult:
         timestamp = time.strftime("%Y%m%d-%H%M%S")
-        output_dir = self.sandbox_dir / f"newsite-{timestamp}"
-        output_dir.mkdir(parents=True, exist_ok=True)
+        # Assemble the build in a private staging directory and publish it
+        # with a single rename, so readers never see a half-written build and
+        # concurrent builds cannot end up sharing a directory.
+        self.sandbox_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.sandbox_dir))
+        css_hash = state.build.get("css_hash")
+        page_hashes = [(page, page.content_hash, page.input_hash) for page in state.pages]
+        try:
+            css_path, changed_files, unchanged_files = self._populate(
+                state, change_set, staging
+            )
+            os.chmod(staging, 0o755)
+            output_dir = self.sandbox_dir / (
+                f"newsite-{timestamp}-{os.getpid()}-{next(_BUILD_SEQUENCE)}"
+            )
+            os.rename(staging, output_dir)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            # The discarded build may already have recorded new stylesheet and
+            # page hashes; keep them describing the still-current build so the
+            # next run re-renders instead of reusing stale output.
+            state.build["css_hash"] = css_hash
+            if css_hash is None:
+                del state.build["css_hash"]
+            for page, content_hash, input_hash in page_hashes:
+                page.content_hash = content_hash
+                page.input_hash = input_hash
+            raise
+
+        def published(path: Path) -> Path:
+            return output_dir / path.relative_to(staging)
+
+        state.build["latest_dist"] = str(output_dir)
+        history = state.build.setdefault("history", [])
+        history.append({"dir": str(output_dir), "timestamp": timestamp})
+
+        return BuildResult(
+            output_dir=output_dir,
+            changed_files=[published(path) for path in changed_files],
+            unchanged_files=[published(path) for path in unchanged_files],
+            css_path=published(css_path) if css_path else None,
+        )
+
+    # ------------------------------------------------------------------
+    def _populate(
+        self, state: SiteState, change_set: ChangeSet, output_dir: Path
+    ) -> Tuple[Path | None, List[Path], List[Path]]:
+        """Write every page and the stylesheet into ``output_dir``."""
 
         previous_dir = state.build.get("latest_dist")
         previous_dir_path = Path(previous_dir) if previous_dir else None
@@ -44,52 +204,117 @@ class IncrementalBuilder:
         if css_path:
             changed_files.append(css_path)
 
+        # Navigation markup is produced by the navigation builder and is
+        # trusted HTML; everything else is escaped by the template. It, the head
+        # links and the nav/head part of each page's input fingerprint are
+        # page-independent, so resolve them once per build.
+        nav_html = Markup(state.nav.get("html") or self._build_nav_html(state))
+        head_links = state.head.get("links", [])
+        site_digest = self._site_fingerprint(state)
+
+        # Several pages can map to one filename (``/about`` and ``/about.html``);
+        # plan each target once so the last page wins, as sequential writes did.
+        planned: Dict[Path, _PagePlan] = {}
         for page in state.pages:
             filename = self._page_filename(page)
-            target = output_dir / filename
-            target.parent.mkdir(parents=True, exist_ok=True)
-
             should_render = page.path in dirty_pages or page.url in dirty_pages
             previous_file = (
                 previous_dir_path / filename if previous_dir_path else None
             )
-
+            fingerprint = self._input_fingerprint(site_digest, state, page)
+            if should_render and page.input_hash == fingerprint:
+                # The operations touched this page but left every rendering
+                # input byte-identical, so the previous output is still valid.
+                should_render = False
             if should_render or not previous_file or not previous_file.exists():
-                html = self._render_page(state, page)
-                content_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
-                page.content_hash = content_hash
-                page.rendered = html
-                target.write_text(html, encoding="utf-8")
-                changed_files.append(target)
-            else:
-                target.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(previous_file, target)
-                unchanged_files.append(target)
+                previous_file = None
+            target = output_dir / filename
+            planned.pop(target, None)
+            planned[target] = (page, target, fingerprint, previous_file)
+        plan = list(planned.values())
 
-        state.build["latest_dist"] = str(output_dir)
-        history = state.build.setdefault("history", [])
-        history.append({"dir": str(output_dir), "timestamp": timestamp})
+        process = partial(self._process_page, state, nav_html, head_links)
+        if len(plan) <= 1:
+            outcomes = [process(item) for item in plan]
+        else:
+            # Pages are independent once nav and head are resolved; file
+            # writes, hardlinks and hashing release the GIL.
+            workers = min(32, os.cpu_count() or 1, len(plan))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(process, plan))
 
-        return BuildResult(
-            output_dir=output_dir,
-            changed_files=changed_files,
-            unchanged_files=unchanged_files,
-            css_path=css_path,
-        )
+        for (_, target, _, _), changed in zip(plan, outcomes):
+            (changed_files if changed else unchanged_files).append(target)
+        return css_path, changed_files, unchanged_files
+
+    def _process_page(
+        self,
+        state: SiteState,
+        nav_html: Markup,
+        head_links: List[dict],
+        item: _PagePlan,
+    ) -> bool:
+        """Render or reuse one planned page; return ``True`` if it was rendered."""
+
+        page, target, fingerprint, previous_file = item
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if previous_file is not None:
+            _reuse(previous_file, target)
+            return False
+
+        # Never write through an existing entry: it may be a hardlink into a
+        # published build, which must stay untouched.
+        target.unlink(missing_ok=True)
+        # Stream the template straight to disk, hashing as we go, so no page
+        # is ever materialised as one string or bytes object.
+        with target.open("wb", buffering=1 << 16) as stream:
+            writer = _HashingWriter(stream)
+            self._render_page(state, page, writer, nav_html, head_links)
+        page.content_hash = writer.hexdigest()
+        page.input_hash = fingerprint
+        # The markup lives in the build directory; keeping a second copy on
+        # the state would bloat every persisted snapshot.
+        page.rendered = None
+        return True
 
-    # ------------------------------------------------------------------
     def _determine_dirty_pages(self, change_set: ChangeSet, state: SiteState) -> set[str]:
-        dirty: set[str] = set()
-        for op in change_set.operations:
-            if op.type.startswith("content.") or op.type.startswith("seo."):
-                if op.page:
-                    dirty.add(op.page)
-            if op.type.startswith("head."):
-                dirty.update(page.path for page in state.pages)
-            if op.type.startswith("nav."):
-                dirty.update(page.path for page in state.pages)
+        operations = change_set.operations
+        dirty = {
+            op.page
+            for op in operations
+            if op.page and op.type.startswith(("content.", "seo."))
+        }
+        # Head and nav changes affect every page; expand to all paths once
+        # rather than once per site-wide operation.
+        if any(op.type.startswith(("head.", "nav.")) for op in operations):
+            dirty.update(page.path for page in state.pages)
         return dirty
 
+    def _site_fingerprint(self, state: SiteState) -> hashlib.blake2b:
+        """Return a digest seeded with the inputs shared by every page."""
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(_RENDER_VERSION.encode("utf-8"))
+        for part in (state.nav, state.head):
+            digest.update(_canonical_json(part))
+            digest.update(b"\0")
+        return digest
+
+    def _input_fingerprint(
+        self, site_digest: hashlib.blake2b, state: SiteState, page: SitePage
+    ) -> str:
+        """Return a digest of everything :meth:`_render_page` reads for ``page``."""
+
+        digest = site_digest.copy()
+        for part in (
+            state.seo.get("meta", {}).get(page.path or page.url, {}),
+            page.title,
+            [(block.id, block.text, block.type, block.meta) for block in page.blocks],
+        ):
+            digest.update(_canonical_json(part))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
     def _page_filename(self, page: SitePage) -> str:
         path = page.path or page.url or "index"
         if path.endswith(".html"):
@@ -104,67 +329,30 @@ class IncrementalBuilder:
                 filename = f"{slug}.html"
         return filename
 
-    def _render_page(self, state: SiteState, page: SitePage) -> str:
-        nav_html = state.nav.get("html") or self._build_nav_html(state)
-        head = state.head
-        seo_meta = state.seo.get("meta", {}).get(page.path or page.url, {})
-        blocks_html = "\n".join(self._render_block(block) for block in page.blocks)
-        head_meta_parts = [
-            f'<meta name="description" content="{seo_meta.get("description", "")}" />'
-            if seo_meta
-            else "",
-        ]
-        head_links = "\n".join(
-            f'<link rel="{link.get("rel", "stylesheet")}" href="{link.get("href", "")}">' for link in head.get("links", [])
-        )
-        title = head.get("title") or page.title or "Updated Page"
-        html = (
-            "<!DOCTYPE html>\n"
-            "<html lang=\"en\">\n"
-            "<head>\n"
-            f"  <meta charset=\"utf-8\"/>\n"
-            f"  <title>{title}</title>\n"
-            f"  {''.join(head_meta_parts)}\n"
-            f"  <link rel=\"stylesheet\" href=\"assets/css/main.css\"/>\n"
-            f"  {head_links}\n"
-            "</head>\n"
-            "<body>\n"
-            f"  <header>{nav_html}</header>\n"
-            f"  <main>\n{blocks_html}\n  </main>\n"
-            "  <footer class=\"site-footer\">Generated by Post-Edit Builder</footer>\n"
-            "</body>\n"
-            "</html>\n"
-        )
-        return html
-
-    def _render_block(self, block: SiteBlock) -> str:
-        text = block.text
-        heading = block.meta.get("heading") or block.id.replace("-", " ").title()
-        extra = ""
-        if block.meta.get("call_to_action"):
-            extra = (
-                "<p class=\"cta\">"
-                f"{block.meta['call_to_action']}"
-                "</p>"
-            )
-        return (
-            f"    <section id=\"{block.id}\" class=\"block-{block.type}\">\n"
-            f"      <h2>{heading}</h2>\n"
-            f"      <p>{text}</p>\n"
-            f"      {extra}\n"
-            "    </section>"
+    def _render_page(
+        self,
+        state: SiteState,
+        page: SitePage,
+        out: _HashingWriter,
+        nav_html: Markup,
+        head_links: List[dict],
+    ) -> None:
+        chunks = _PAGE_TEMPLATE.generate(
+            title=state.head.get("title") or page.title or "Updated Page",
+            seo_meta=state.seo.get("meta", {}).get(page.path or page.url, {}),
+            head_links=head_links,
+            nav_html=nav_html,
+            blocks=page.blocks,
         )
+        for chunk in chunks:
+            out.write(chunk)
 
     def _build_nav_html(self, state: SiteState) -> str:
-        items_html = "".join(
-            f"<li><a href=\"{item.get('href', '#')}\">{item.get('label', 'Item')}</a></li>"
-            for item in state.nav.get("items", [])
-        )
         layout = state.nav.get("layout", {})
         classes = ["nav"]
         if layout.get("location"):
             classes.append(f"nav-{layout['location']}")
-        return f"<nav class=\"{' '.join(classes)}\"><ul>{items_html}</ul></nav>"
+        return _NAV_TEMPLATE.render(classes=" ".join(classes), items=state.nav.get("items", []))
 
     def _write_css(self, state: SiteState, output_dir: Path, change_set: ChangeSet) -> Path | None:
         if not any(op.type.startswith("css.") for op in change_set.operations):
@@ -175,14 +363,25 @@ class IncrementalBuilder:
                 if previous_path.exists():
                     target = output_dir / "assets" / "css" / "main.css"
                     target.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(previous_path, target)
+                    _reuse(previous_path, target)
                     return target
             return None
 
         css_content = state.css_bundle.get("raw") or self._generate_css_from_tokens(state)
+        css_bytes = css_content.encode("utf-8")
+        css_hash = hashlib.blake2b(css_bytes, digest_size=16).hexdigest()
         target = output_dir / "assets" / "css" / "main.css"
         target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(css_content, encoding="utf-8")
+        previous_dir = state.build.get("latest_dist")
+        if previous_dir and css_hash == state.build.get("css_hash"):
+            # A CSS operation that produced identical output; keep the
+            # previous file rather than writing the same bytes again.
+            previous_path = Path(previous_dir) / "assets" / "css" / "main.css"
+            if previous_path.exists():
+                _reuse(previous_path, target)
+                return target
+        target.write_bytes(css_bytes)
+        state.build["css_hash"] = css_hash
         return target
 
     def _generate_css_from_tokens(self, state: SiteState) -> str:
@@ -5,7 +5,12 @@ from __future__ import annotations
 import hashlib
 import json
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Sequence
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover - fallback when dependency missing
+    orjson = None  # type: ignore[assignment]
 
 
 def _ensure_dict(value: Dict[str, Any] | None) -> Dict[str, Any]:
@@ -16,6 +21,33 @@ def _ensure_list(value: Sequence[Any] | None) -> List[Any]:
     return list(value or [])
 
 
+def _as_dict(value: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Return ``value`` itself for serialisation; only ``from_dict`` copies."""
+
+    return value if isinstance(value, dict) else {}
+
+
+def _as_list(value: Sequence[Any] | None) -> List[Any]:
+    return value if isinstance(value, list) else list(value or [])
+
+
+def _canonical_json(value: Any) -> bytes:
+    """Return compact, key-sorted UTF-8 JSON used for hashing and ordering.
+
+    orjson and the stdlib fallback emit identical bytes for JSON-native data,
+    so hashes do not depend on which backend is installed.
+    """
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # pragma: no cover - e.g. integers beyond 64 bit
+            pass
+    return json.dumps(
+        _json_ready(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
 @dataclass(slots=True)
 class SiteBlock:
     """Represents a logical block of content within a page."""
@@ -30,7 +62,7 @@ class SiteBlock:
             "id": self.id,
             "text": self.text,
             "type": self.type,
-            "meta": dict(self.meta or {}),
+            "meta": _as_dict(self.meta),
         }
 
     @classmethod
@@ -56,6 +88,7 @@ class SitePage:
     seo: Dict[str, Any] = field(default_factory=dict)
     meta: Dict[str, Any] = field(default_factory=dict)
     content_hash: str | None = None
+    input_hash: str | None = None
     rendered: str | None = None
 
     def to_dict(self) -> Dict[str, Any]:
@@ -64,11 +97,12 @@ class SitePage:
             "url": self.url,
             "title": self.title,
             "blocks": [block.to_dict() for block in self.blocks],
-            "sections": _ensure_list(self.sections),
-            "assets": _ensure_dict(self.assets),
-            "seo": _ensure_dict(self.seo),
-            "meta": _ensure_dict(self.meta),
+            "sections": _as_list(self.sections),
+            "assets": _as_dict(self.assets),
+            "seo": _as_dict(self.seo),
+            "meta": _as_dict(self.meta),
             "content_hash": self.content_hash,
+            "input_hash": self.input_hash,
             "rendered": self.rendered,
         }
 
@@ -85,6 +119,7 @@ class SitePage:
             seo=_ensure_dict(data.get("seo")),
             meta=_ensure_dict(data.get("meta")),
             content_hash=data.get("content_hash"),
+            input_hash=data.get("input_hash"),
             rendered=data.get("rendered"),
         )
 
@@ -128,17 +163,26 @@ class SiteState:
         default_factory=lambda: {"meta": {}, "ld_json": {}}
     )
     build: Dict[str, Any] = field(default_factory=dict)
+    # Lookup index for ``find_page`` mapping each path and url to the
+    # position of its first page; rebuilt when ``pages`` is replaced or
+    # resized, or when a lookup finds the index out of date.
+    _page_index: Dict[str, int] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _indexed_pages: Tuple[List[SitePage] | None, int] = field(
+        default=(None, 0), init=False, repr=False, compare=False
+    )
 
     def to_dict(self) -> Dict[str, Any]:
         return {
-            "nav": _ensure_dict(self.nav),
-            "head": _ensure_dict(self.head),
+            "nav": _as_dict(self.nav),
+            "head": _as_dict(self.head),
             "pages": [page.to_dict() for page in self.pages],
-            "theme": _ensure_dict(self.theme),
-            "css_bundle": _ensure_dict(self.css_bundle),
-            "assets": _ensure_dict(self.assets),
-            "seo": _ensure_dict(self.seo),
-            "build": _ensure_dict(self.build),
+            "theme": _as_dict(self.theme),
+            "css_bundle": _as_dict(self.css_bundle),
+            "assets": _as_dict(self.assets),
+            "seo": _as_dict(self.seo),
+            "build": _as_dict(self.build),
         }
 
     @classmethod
@@ -186,18 +230,48 @@ class SiteState:
     def find_page(self, path_or_url: str) -> SitePage | None:
         """Return the first page matching ``path_or_url``."""
 
-        for page in self.pages:
-            if page.path == path_or_url or page.url == path_or_url:
-                return page
-        return None
+        indexed, count = self._indexed_pages
+        if indexed is not self.pages or count != len(self.pages):
+            self._reindex_pages()
+        page = self._indexed_page(path_or_url)
+        if page is None:
+            # Paths, urls and slots can all be edited in place after indexing,
+            # so confirm a miss with a scan and refresh the index if it lied.
+            page = next(
+                (candidate for candidate in self.pages if path_or_url in (candidate.path, candidate.url)),
+                None,
+            )
+            if page is not None or path_or_url in self._page_index:
+                self._reindex_pages()
+        return page
 
     def ensure_page(self, path: str, *, url: str | None = None, title: str | None = None) -> SitePage:
         page = self.find_page(path)
         if page is None:
             page = SitePage(path=path, url=url or path, title=title or path)
             self.pages.append(page)
+            position = len(self.pages) - 1
+            self._page_index.setdefault(page.path, position)
+            self._page_index.setdefault(page.url, position)
+            self._indexed_pages = (self.pages, len(self.pages))
         return page
 
+    def _indexed_page(self, path_or_url: str) -> SitePage | None:
+        position = self._page_index.get(path_or_url)
+        if position is None:
+            return None
+        page = self.pages[position]
+        return page if path_or_url in (page.path, page.url) else None
+
+    def _reindex_pages(self) -> None:
+        index: Dict[str, int] = {}
+        for position, page in enumerate(self.pages):
+            # First match wins, mirroring a front-to-back scan.
+            index.setdefault(page.path, position)
+            index.setdefault(page.url, position)
+        self._page_index = index
+        self._indexed_pages = (self.pages, len(self.pages))
+
 
 @dataclass(slots=True)
 class ChangeOperation:
@@ -240,39 +314,49 @@ class ChangeSet:
         }
 
     def hash(self) -> str:
-        canonical = json.dumps(self.to_dict(), sort_keys=True)
-        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return hashlib.sha256(_canonical_json(self.to_dict())).hexdigest()
 
     def is_empty(self) -> bool:
         return not self.operations
 
 
+def _json_ready(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(key): _json_ready(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_ready(item) for item in value]
+    return value
+
+
 def safe_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Return a JSON-safe payload recursively."""
+    """Return a JSON-safe payload recursively.
 
-    def _convert(value: Any) -> Any:
-        if isinstance(value, dict):
-            return {str(key): _convert(val) for key, val in value.items()}
-        if isinstance(value, (list, tuple)):
-            return [_convert(item) for item in value]
-        return value
+    With orjson available the normalisation is a single round trip in C;
+    values it cannot encode natively are stringified.
+    """
 
-    return _convert(payload)
+    if orjson is not None:
+        try:
+            return orjson.loads(
+                orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+            )
+        except TypeError:  # pragma: no cover - e.g. integers beyond 64 bit
+            pass
+    return _json_ready(payload)
 
 
 def merge_operations(operations: Iterable[ChangeOperation]) -> List[ChangeOperation]:
     """Return operations sorted deterministically for idempotency."""
 
-    sorted_ops = sorted(
+    return sorted(
         operations,
         key=lambda op: (
             op.type,
             op.page or "",
             op.block_id or "",
-            json.dumps(safe_payload(op.payload), sort_keys=True),
+            _canonical_json(op.payload),
         ),
     )
-    return list(sorted_ops)
 
 
 __all__ = [
@@ -3,10 +3,136 @@
 from __future__ import annotations
 
 import difflib
+import hashlib
+import heapq
+import multiprocessing
+import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
+from itertools import groupby
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Tuple
+
+try:  # pragma: no cover - exercised implicitly when dependency is available
+    from diff_match_patch import diff_match_patch
+except ModuleNotFoundError:  # pragma: no cover - fallback when dependency missing
+    diff_match_patch = None  # type: ignore[assignment,misc]
+
+from ..storage import list_files
+
+if TYPE_CHECKING:
+    from ..state import StateStore
+
+# Only these are decoded and diffed; anything else (images, fonts, PDFs) is
+# reported by size, as decoding it would only feed garbage to the differ.
+_TEXT_EXTS = {".html", ".htm", ".css", ".js", ".json", ".svg", ".xml", ".txt", ".md"}
+
+_CONTEXT_LINES = 3
+
+# Fixed document shell around the preview sections, encoded once at import.
+_HTML_PREFIX = (
+    "<!DOCTYPE html>\n"
+    "<html lang=\"en\">\n"
+    "<head><meta charset=\"utf-8\"/><title>Preview</title>"
+    "<style>body{font-family:Inter,sans-serif;margin:2rem;}table{border-collapse:collapse;}"
+    "td,th{border:1px solid #ccc;padding:0.25rem 0.5rem;}"
+    "tr:nth-child(even){background:#f6f6f6;}</style></head>\n"
+    "<body>\n"
+).encode("utf-8")
+_HTML_SUFFIX = b"</body>\n</html>\n"
+
+# Spawning workers and pickling the texts costs far more than diffing a
+# typical page, so the process pool is only used for several changed files
+# carrying several megabytes of text, and only with more than one CPU.
+_PROCESS_POOL_MIN = 4
+_PROCESS_POOL_MIN_CHARS = 4 << 20
+# Spawned workers do not inherit the parent's threads or locks.
+_SPAWN = multiprocessing.get_context("spawn")
+
+
+def _differing_range(old_lines: List[str], new_lines: List[str]) -> Tuple[int, int, int]:
+    """Return ``(start, old_end, new_end)`` bounding the lines that differ."""
+
+    limit = min(len(old_lines), len(new_lines))
+    start = 0
+    while start < limit and old_lines[start] == new_lines[start]:
+        start += 1
+    old_end, new_end = len(old_lines), len(new_lines)
+    while old_end > start and new_end > start and old_lines[old_end - 1] == new_lines[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+def _context_hunks(diffs: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+    """Split ``diffs`` into hunks, keeping a few context lines per change.
+
+    ``diff_prettyHtml`` renders equal runs in full, which would copy the whole
+    file into the preview for a one-line edit.
+    """
+
+    hunks: List[List[Tuple[int, str]]] = [[]]
+    last = len(diffs) - 1
+    for index, (op, text) in enumerate(diffs):
+        if op != diff_match_patch.DIFF_EQUAL:
+            hunks[-1].append((op, text))
+            continue
+        lines = text.splitlines(keepends=True)
+        # A run that starts or ends mid-line carries the rest of a changed
+        # line; keep that fragment on top of the full context lines.
+        head = tail = 0
+        if index:
+            head = _CONTEXT_LINES + (not diffs[index - 1][1].endswith("\n"))
+        if index != last:
+            tail = _CONTEXT_LINES + (not text.endswith("\n"))
+        if len(lines) <= head + tail:
+            hunks[-1].append((op, text))
+            continue
+        if head:
+            hunks[-1].append((op, "".join(lines[:head])))
+        if hunks[-1]:
+            hunks.append([])
+        if tail:
+            hunks[-1].append((op, "".join(lines[-tail:])))
+    return [hunk for hunk in hunks if hunk]
+
+
+def _diff_one_file(old_text: str, new_text: str) -> str:
+    """Render the differences between two versions of one file.
+
+    Module-level so it can be shipped to worker processes.
+    """
+
+    if diff_match_patch is not None:
+        # Character-level diff in bounded time; far cheaper than
+        # HtmlDiff's line matching on large files.
+        dmp = diff_match_patch()
+        dmp.Diff_Timeout = 1.0
+        diffs = dmp.diff_main(old_text, new_text)
+        dmp.diff_cleanupSemantic(diffs)
+        body = '<div class="diff-gap">…</div>'.join(
+            dmp.diff_prettyHtml(hunk) for hunk in _context_hunks(diffs)
+        )
+        return f'<div class="diff">{body}</div>'
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    # HtmlDiff's line matching is quadratic; strip the common head and
+    # tail (keeping the context lines it would show anyway) first.
+    start, old_end, new_end = _differing_range(old_lines, new_lines)
+    start = max(0, start - _CONTEXT_LINES)
+    old_end = min(len(old_lines), old_end + _CONTEXT_LINES)
+    new_end = min(len(new_lines), new_end + _CONTEXT_LINES)
+    suffix = f" (from line {start + 1})" if start else ""
+    return difflib.HtmlDiff(wrapcolumn=80).make_table(
+        old_lines[start:old_end],
+        new_lines[start:new_end],
+        fromdesc=f"previous{suffix}",
+        todesc=f"new{suffix}",
+        context=True,
+        numlines=_CONTEXT_LINES,
+    )
 
 
 @dataclass(slots=True)
@@ -20,9 +146,16 @@ class PreviewResult:
 class PreviewGenerator:
     """Create HTML previews comparing old and new dist directories."""
 
-    def __init__(self, sandbox_dir: Path) -> None:
+    def __init__(self, sandbox_dir: Path, *, state_store: StateStore | None = None) -> None:
         self.preview_root = sandbox_dir / "preview"
         self.preview_root.mkdir(parents=True, exist_ok=True)
+        self.state_store = state_store
+        # (path, mtime_ns, size) -> BLAKE2b digest, so repeated previews do
+        # not rehash files that have not changed on disk.
+        self._digests: Dict[Tuple[str, int, int], bytes] = {}
+        # Directory manifests loaded or rebuilt, persisted after each preview.
+        self._manifests: Dict[Path, Dict[str, Any]] = {}
+        self._rescanned: set[Path] = set()
 
     def generate(self, *, old_dir: Path | None, new_dir: Path) -> PreviewResult:
         preview_id = uuid.uuid4().hex
@@ -31,85 +164,172 @@ class PreviewGenerator:
         index_path = target_dir / "index.html"
 
         if old_dir and old_dir.exists():
-            diff_html = self._diff_directories(old_dir, new_dir)
+            sections = self._diff_directories(old_dir, new_dir)
         else:
-            diff_html = self._render_new_only(new_dir)
+            sections = self._render_new_only(new_dir)
 
-        index_path.write_text(diff_html, encoding="utf-8")
+        # Stream the document section by section; multi-file diffs can run to
+        # many megabytes and never need to exist as one string.
+        with open(index_path, "wb", buffering=1 << 20) as handle:
+            for chunk in self._wrap_html(sections):
+                handle.write(chunk)
+        self._save_manifests()
         return PreviewResult(preview_id=preview_id, index_path=index_path, old_dir=old_dir, new_dir=new_dir)
 
-    def _diff_directories(self, old_dir: Path, new_dir: Path) -> str:
+    def _diff_directories(self, old_dir: Path, new_dir: Path) -> Iterator[str]:
+        """Yield the HTML sections describing how ``new_dir`` differs."""
+
         old_files = self._list_files(old_dir)
         new_files = self._list_files(new_dir)
-        all_files = sorted(set(old_files) | set(new_files))
-
-        sections: List[str] = [
-            "<h1>Preview Diff</h1>",
-            "<p>Comparing the previous build with the new build.</p>",
-        ]
-
-        diff = difflib.HtmlDiff(wrapcolumn=80)
-        for relative in all_files:
-            old_path = old_dir / relative
-            new_path = new_dir / relative
-            if old_path.exists():
-                old_lines = old_path.read_text(encoding="utf-8", errors="ignore").splitlines()
-            else:
-                old_lines = []
-            if new_path.exists():
-                new_lines = new_path.read_text(encoding="utf-8", errors="ignore").splitlines()
-            else:
-                new_lines = []
-            if old_lines == new_lines:
-                continue
-            sections.append(f"<h2>{relative}</h2>")
-            sections.append(
-                diff.make_table(
-                    old_lines,
-                    new_lines,
-                    fromdesc="previous",
-                    todesc="new",
-                    context=True,
-                    numlines=3,
-                )
-            )
-
-        if len(sections) == 2:
-            sections.append("<p>No differences detected – builds are identical.</p>")
-
-        return self._wrap_html("\n".join(sections))
-
-    def _render_new_only(self, new_dir: Path) -> str:
-        sections = [
-            "<h1>New Build</h1>",
-            "<p>No previous build found. Listing files in the generated directory.</p>",
-            "<ul>",
-        ]
+        # Both listings are sorted, so a linear merge yields the sorted union.
+        all_files = [name for name, _ in groupby(heapq.merge(old_files, new_files))]
+
+        yield "<h1>Preview Diff</h1>"
+        yield "<p>Comparing the previous build with the new build.</p>"
+
+        diff_one = partial(self._diff_one, old_dir, new_dir)
+        if len(all_files) < 4:
+            outcomes = [diff_one(relative) for relative in all_files]
+        else:
+            # Files are independent; reading and diffing them concurrently
+            # overlaps I/O, and map() keeps the sorted order.
+            workers = min(32, (os.cpu_count() or 1) * 4, len(all_files))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(diff_one, all_files))
+        changes = [outcome for outcome in outcomes if outcome is not None]
+        if not changes:
+            yield "<p>No differences detected – builds are identical.</p>"
+            return
+
+        # Diffs are rendered lazily and in order, so each section is written
+        # out as soon as it is ready rather than after the whole batch.
+        pending = [body for _, body in changes if isinstance(body, tuple)]
+        rendered = self._diff_texts(pending)
+        for heading, body in changes:
+            yield heading
+            yield body if isinstance(body, str) else next(rendered)
+
+    def _diff_texts(self, pairs: List[Tuple[str, str]]) -> Iterator[str]:
+        """Yield the rendering of each ``(old_text, new_text)`` pair in order."""
+
+        cpus = os.cpu_count() or 1
+        if (
+            cpus < 2
+            or len(pairs) < _PROCESS_POOL_MIN
+            or sum(len(old) + len(new) for old, new in pairs) < _PROCESS_POOL_MIN_CHARS
+        ):
+            for old_text, new_text in pairs:
+                yield _diff_one_file(old_text, new_text)
+            return
+        # Diffing is pure-Python CPU work that threads cannot overlap under
+        # the GIL; spread it across processes once there is enough of it.
+        workers = min(cpus, len(pairs))
+        chunksize = max(1, len(pairs) // (4 * workers))
+        olds, news = zip(*pairs)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_SPAWN) as pool:
+            yield from pool.map(_diff_one_file, olds, news, chunksize=chunksize)
+
+    def _diff_one(
+        self, old_dir: Path, new_dir: Path, relative: str
+    ) -> Tuple[str, str | Tuple[str, str]] | None:
+        """Compare ``relative`` in both builds; ``None`` means unchanged.
+
+        Otherwise returns the section heading and either finished HTML (for
+        binary files) or the ``(old_text, new_text)`` pair still to be diffed.
+        """
+
+        old_path = old_dir / relative
+        new_path = new_dir / relative
+        if old_path.exists() and new_path.exists() and self._same_content(old_path, new_path):
+            return None
+        heading = f"<h2>{relative}</h2>"
+        if Path(relative).suffix.lower() not in _TEXT_EXTS:
+            return heading, self._binary_note(old_path, new_path)
+        old_data = old_path.read_bytes() if old_path.exists() else b""
+        new_data = new_path.read_bytes() if new_path.exists() else b""
+        if b"\0" in old_data[:512] or b"\0" in new_data[:512]:
+            return heading, self._binary_note(old_path, new_path)
+        old_text = old_data.decode("utf-8", errors="ignore")
+        new_text = new_data.decode("utf-8", errors="ignore")
+        if old_text == new_text:
+            return None
+        return heading, (old_text, new_text)
+
+    def _binary_note(self, old_path: Path, new_path: Path) -> str:
+        old_size = old_path.stat().st_size if old_path.exists() else 0
+        new_size = new_path.stat().st_size if new_path.exists() else 0
+        return f"<p>Binary file differs (old {old_size} bytes → new {new_size} bytes).</p>"
+
+    def _same_content(self, old_path: Path, new_path: Path) -> bool:
+        """Cheaply decide whether two files are byte-identical."""
+
+        old_stat = old_path.stat()
+        new_stat = new_path.stat()
+        if (old_stat.st_dev, old_stat.st_ino) == (new_stat.st_dev, new_stat.st_ino):
+            # Unchanged pages are hardlinked between builds.
+            return True
+        if old_stat.st_size != new_stat.st_size:
+            return False
+        return self._digest(old_path, old_stat) == self._digest(new_path, new_stat)
+
+    def _digest(self, path: Path, stat: os.stat_result) -> bytes:
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(key)
+        if digest is None:
+            with path.open("rb") as handle:
+                digest = hashlib.file_digest(
+                    handle, lambda: hashlib.blake2b(digest_size=16)
+                ).digest()
+            self._digests[key] = digest
+        return digest
+
+    def _render_new_only(self, new_dir: Path) -> Iterator[str]:
+        yield "<h1>New Build</h1>"
+        yield "<p>No previous build found. Listing files in the generated directory.</p>"
+        yield "<ul>"
         for relative in self._list_files(new_dir):
-            sections.append(f"  <li>{relative}</li>")
-        sections.append("</ul>")
-        return self._wrap_html("\n".join(sections))
+            yield f"  <li>{relative}</li>"
+        yield "</ul>"
 
     def _list_files(self, directory: Path) -> List[str]:
-        files: List[str] = []
-        for path in directory.rglob("*"):
-            if path.is_file():
-                files.append(str(path.relative_to(directory)))
-        return sorted(files)
-
-    def _wrap_html(self, body: str) -> str:
-        return (
-            "<!DOCTYPE html>\n"
-            "<html lang=\"en\">\n"
-            "<head><meta charset=\"utf-8\"/><title>Preview</title>"
-            "<style>body{font-family:Inter,sans-serif;margin:2rem;}table{border-collapse:collapse;}"
-            "td,th{border:1px solid #ccc;padding:0.25rem 0.5rem;}"
-            "tr:nth-child(even){background:#f6f6f6;}</style></head>\n"
-            "<body>\n"
-            f"{body}\n"
-            "</body>\n"
-            "</html>\n"
-        )
+        """List ``directory``, reusing the stored manifest when still valid.
+
+        Published builds are never modified, so an unchanged root mtime means
+        the stored listing and file digests can be reused without a rescan.
+        """
+
+        if self.state_store is None:
+            return list_files(directory)
+        root_mtime = directory.stat().st_mtime_ns
+        manifest = self._manifests.get(directory) or self.state_store.get_dir_manifest(directory)
+        if manifest is None or manifest.get("mtime_ns") != root_mtime:
+            manifest = {"mtime_ns": root_mtime, "files": list_files(directory), "digests": {}}
+            self._rescanned.add(directory)
+        for relative, (size, mtime_ns, digest) in manifest["digests"].items():
+            self._digests[(str(directory / relative), mtime_ns, size)] = bytes.fromhex(digest)
+        self._manifests[directory] = manifest
+        return manifest["files"]
+
+    def _save_manifests(self) -> None:
+        if self.state_store is None:
+            return
+        for directory, manifest in self._manifests.items():
+            prefix = f"{directory}{os.sep}"
+            digests = {
+                path[len(prefix):]: [size, mtime_ns, digest.hex()]
+                for (path, mtime_ns, size), digest in list(self._digests.items())
+                if path.startswith(prefix)
+            }
+            if directory in self._rescanned or digests != manifest["digests"]:
+                manifest["digests"] = digests
+                self.state_store.put_dir_manifest(directory, manifest)
+        self._rescanned.clear()
+
+    def _wrap_html(self, sections: Iterable[str]) -> Iterator[bytes]:
+        yield _HTML_PREFIX
+        for section in sections:
+            yield f"{section}\n".encode("utf-8")
+        yield _HTML_SUFFIX
 
 
 __all__ = ["PreviewGenerator", "PreviewResult"]
@@ -2,19 +2,87 @@
 
 from __future__ import annotations
 
+import atexit
+import hashlib
 import json
 import sqlite3
+import threading
+import time
 import uuid
+import weakref
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional
 
 from .postedit.models import ChangeSet, SiteState
 
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover - fallback when dependency missing
+    orjson = None  # type: ignore[assignment]
+
+# Live stores, so their connections are closed cleanly at interpreter exit.
+# Connections opened by worker threads are released when the thread ends.
+_STORES: "weakref.WeakSet[StateStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_stores() -> None:
+    for store in list(_STORES):
+        store.close()
+
+
+_INSERT_TRACE = (
+    "INSERT INTO trace(id, provider, model, request_trunc, response_trunc, duration_ms, created_at, tokens_json)"
+    " VALUES(?,?,?,?,?,?,?,?)"
+)
+
+
+# (epoch second, formatted UTC timestamp) of the last call; replaced as a
+# whole so concurrent callers never see a mismatched pair.
+_LAST_TIMESTAMP: tuple[int, str] = (-1, "")
+
 
 def _iso_now() -> str:
-    return datetime.utcnow().isoformat(timespec="seconds")
+    global _LAST_TIMESTAMP
+    now = int(time.time())
+    second, formatted = _LAST_TIMESTAMP
+    if now != second:
+        formatted = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+        _LAST_TIMESTAMP = (now, formatted)
+    return formatted
+
+
+def _encode_state(payload: Dict[str, Any]) -> str:
+    """Encode a site-state payload, using orjson's C encoder when available."""
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:  # pragma: no cover - values orjson cannot encode
+            pass
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _decode_state(raw: str) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _manifest_key(directory: Path) -> str:
+    return f"manifest:{directory.resolve()}"
+
+
+def _hash_file(path: Path) -> str:
+    """Return the BLAKE2b digest of ``path``, read in fixed-size chunks."""
+
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb", buffering=0) as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def _json_safe(value: Any) -> Any:
@@ -26,9 +94,9 @@ def _json_safe(value: Any) -> Any:
         return [_json_safe(item) for item in value]
     if isinstance(value, Path):
         return str(value)
-    if hasattr(value, "to_dict") and callable(getattr(value, "to_dict")):
+    if callable(to_dict := getattr(value, "to_dict", None)):
         try:
-            return _json_safe(value.to_dict())
+            return _json_safe(to_dict())
         except Exception:
             return str(value)
     if isinstance(value, (str, int, float, bool)) or value is None:
@@ -54,15 +122,49 @@ class StateStore:
     def __init__(self, db_path: Path) -> None:
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._bulk_depth = 0
+        self._trace_buffer: list[tuple[Any, ...]] = []
+        _STORES.add(self)
         self._ensure_schema()
 
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Return this thread's connection, opening it on first use."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._local.conn = conn
         return conn
 
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close the calling thread's connection, if one is open."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
     def _ensure_schema(self) -> None:
-        with self._connect() as conn:
+        with self._transaction() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -75,6 +177,15 @@ class StateStore:
                 )
                 """
             )
+            try:
+                cursor.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS artifacts_hash ON artifacts(hash)"
+                )
+            except sqlite3.IntegrityError:
+                # Databases written before artifacts were content-addressed
+                # may already hold duplicate hashes; keep working without
+                # deduplication rather than refusing to open them.
+                pass
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS site_state (
@@ -93,10 +204,19 @@ class StateStore:
                     prompt TEXT,
                     llm_meta_json TEXT,
                     diff_stats_json TEXT,
-                    created_at TEXT
+                    created_at TEXT,
+                    change_set_hash TEXT
                 )
                 """
             )
+            edit_columns = {row["name"] for row in conn.execute("PRAGMA table_info(edits)")}
+            if "change_set_hash" not in edit_columns:
+                cursor.execute("ALTER TABLE edits ADD COLUMN change_set_hash TEXT")
+                self._backfill_change_set_hashes(conn)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS edits_change_hash ON edits(change_set_hash)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS edits_created ON edits(created_at DESC)")
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS previews (
@@ -108,6 +228,9 @@ class StateStore:
                 )
                 """
             )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS previews_created ON previews(created_at DESC)"
+            )
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS trace (
@@ -122,26 +245,55 @@ class StateStore:
                 )
                 """
             )
-            conn.commit()
+
+    @staticmethod
+    def _backfill_change_set_hashes(conn: sqlite3.Connection) -> None:
+        """Copy hashes stored inside ``diff_stats_json`` into their own column."""
+
+        rows = conn.execute(
+            "SELECT id, diff_stats_json FROM edits WHERE diff_stats_json IS NOT NULL"
+        ).fetchall()
+        updates = []
+        for row in rows:
+            change_hash = json.loads(row["diff_stats_json"]).get("change_set_hash")
+            if change_hash:
+                updates.append((str(change_hash), row["id"]))
+        conn.executemany("UPDATE edits SET change_set_hash = ? WHERE id = ?", updates)
 
     # ------------------------------------------------------------------
     # Site state
     # ------------------------------------------------------------------
     def load_site_state(self, *, key: str = "current") -> SiteState:
-        with self._connect() as conn:
-            cursor = conn.execute(
-                "SELECT value_json FROM site_state WHERE key = ?", (key,)
-            )
-            row = cursor.fetchone()
+        conn = self._connect()
+        cursor = conn.execute(
+            "SELECT value_json FROM site_state WHERE key = ?", (key,)
+        )
+        row = cursor.fetchone()
         payload: Dict[str, Any] | None = None
         if row and row[0]:
-            payload = json.loads(row[0])
+            payload = _decode_state(row[0])
         return SiteState.from_dict(payload)
 
     def save_site_state(self, state: SiteState, *, key: str = "current") -> None:
-        payload = json.dumps(state.to_dict(), ensure_ascii=False)
+        self._put_value(key, _encode_state(state.to_dict()))
+
+    def get_dir_manifest(self, directory: Path) -> Dict[str, Any] | None:
+        """Return the stored file manifest for ``directory``, if any."""
+
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value_json FROM site_state WHERE key = ?", (_manifest_key(directory),)
+        ).fetchone()
+        if row and row[0]:
+            return _decode_state(row[0])
+        return None
+
+    def put_dir_manifest(self, directory: Path, manifest: Dict[str, Any]) -> None:
+        self._put_value(_manifest_key(directory), _encode_state(manifest))
+
+    def _put_value(self, key: str, payload: str) -> None:
         now = _iso_now()
-        with self._connect() as conn:
+        with self._transaction() as conn:
             conn.execute(
                 """
                 INSERT INTO site_state(id, key, value_json, updated_at)
@@ -152,19 +304,31 @@ class StateStore:
                 """,
                 (uuid.uuid4().hex, key, payload, now),
             )
-            conn.commit()
 
     # ------------------------------------------------------------------
     # Artifacts
     # ------------------------------------------------------------------
     def record_artifact(self, kind: str, path: Path, *, file_hash: str | None = None) -> str:
+        """Record ``path`` and return its artifact id.
+
+        Artifacts are content-addressed: when ``file_hash`` is omitted the file
+        is hashed, and recording identical content again returns the id of the
+        existing row instead of inserting a duplicate.
+        """
+
+        if file_hash is None and path.is_file():
+            file_hash = _hash_file(path)
         artifact_id = uuid.uuid4().hex
-        with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO artifacts(id, kind, path, hash, created_at) VALUES(?,?,?,?,?)",
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO artifacts(id, kind, path, hash, created_at) VALUES(?,?,?,?,?)",
                 (artifact_id, kind, str(path), file_hash, _iso_now()),
             )
-            conn.commit()
+            if cursor.rowcount == 0:
+                row = conn.execute(
+                    "SELECT id FROM artifacts WHERE hash = ?", (file_hash,)
+                ).fetchone()
+                artifact_id = row["id"]
         return artifact_id
 
     # ------------------------------------------------------------------
@@ -184,10 +348,10 @@ class StateStore:
         diff_payload.setdefault("change_set_hash", change_set.hash())
         diff_payload = _json_safe(diff_payload)
         llm_payload = _json_safe(llm_meta or {})
-        with self._connect() as conn:
+        with self._transaction() as conn:
             conn.execute(
-                "INSERT INTO edits(id, scope, prompt, llm_meta_json, diff_stats_json, created_at)"
-                " VALUES(?,?,?,?,?,?)",
+                "INSERT INTO edits(id, scope, prompt, llm_meta_json, diff_stats_json, created_at,"
+                " change_set_hash) VALUES(?,?,?,?,?,?,?)",
                 (
                     entry_id,
                     scope,
@@ -195,51 +359,42 @@ class StateStore:
                     json.dumps(llm_payload, ensure_ascii=False),
                     json.dumps(diff_payload, ensure_ascii=False),
                     _iso_now(),
+                    str(diff_payload["change_set_hash"]),
                 ),
             )
-            conn.commit()
         return entry_id
 
     def list_edits(self) -> list[EditRecord]:
-        with self._connect() as conn:
-            cursor = conn.execute(
-                "SELECT id, scope, prompt, diff_stats_json, created_at FROM edits ORDER BY created_at DESC"
+        conn = self._connect()
+        cursor = conn.execute(
+            "SELECT id, scope, prompt, change_set_hash, created_at FROM edits ORDER BY created_at DESC"
+        )
+        return [
+            EditRecord(
+                id=row["id"],
+                scope=row["scope"],
+                prompt=row["prompt"],
+                change_set_hash=row["change_set_hash"] or "",
+                created_at=row["created_at"],
             )
-            rows = cursor.fetchall()
-        edits: list[EditRecord] = []
-        for row in rows:
-            diff_stats = json.loads(row["diff_stats_json"]) if row["diff_stats_json"] else {}
-            edits.append(
-                EditRecord(
-                    id=row["id"],
-                    scope=row["scope"],
-                    prompt=row["prompt"],
-                    change_set_hash=str(diff_stats.get("change_set_hash", "")),
-                    created_at=row["created_at"],
-                )
-            )
-        return edits
+            for row in cursor.fetchall()
+        ]
 
     def has_change_set(self, change_hash: str) -> bool:
         if not change_hash:
             return False
-        with self._connect() as conn:
-            cursor = conn.execute("SELECT diff_stats_json FROM edits")
-            rows = cursor.fetchall()
-        for row in rows:
-            if not row[0]:
-                continue
-            data = json.loads(row[0])
-            if data.get("change_set_hash") == change_hash:
-                return True
-        return False
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT 1 FROM edits WHERE change_set_hash = ? LIMIT 1", (change_hash,)
+        ).fetchone()
+        return row is not None
 
     # ------------------------------------------------------------------
     # Previews
     # ------------------------------------------------------------------
     def record_preview(self, *, old_dir: Path | None, new_dir: Path, index_path: Path) -> str:
         preview_id = uuid.uuid4().hex
-        with self._connect() as conn:
+        with self._transaction() as conn:
             conn.execute(
                 "INSERT INTO previews(id, old_dir, new_dir, index_path, created_at) VALUES(?,?,?,?,?)",
                 (
@@ -250,15 +405,14 @@ class StateStore:
                     _iso_now(),
                 ),
             )
-            conn.commit()
         return preview_id
 
     def latest_preview(self) -> Optional[Dict[str, Any]]:
-        with self._connect() as conn:
-            cursor = conn.execute(
-                "SELECT id, old_dir, new_dir, index_path, created_at FROM previews ORDER BY created_at DESC LIMIT 1"
-            )
-            row = cursor.fetchone()
+        conn = self._connect()
+        cursor = conn.execute(
+            "SELECT id, old_dir, new_dir, index_path, created_at FROM previews ORDER BY created_at DESC LIMIT 1"
+        )
+        row = cursor.fetchone()
         if not row:
             return None
         return {
@@ -283,24 +437,40 @@ class StateStore:
         tokens: Dict[str, Any] | None = None,
     ) -> str:
         trace_id = uuid.uuid4().hex
-        with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO trace(id, provider, model, request_trunc, response_trunc, duration_ms, created_at, tokens_json)"
-                " VALUES(?,?,?,?,?,?,?,?)",
-                (
-                    trace_id,
-                    provider,
-                    model,
-                    request_trunc,
-                    response_trunc,
-                    duration_ms,
-                    _iso_now(),
-                    json.dumps(tokens or {}, ensure_ascii=False),
-                ),
-            )
-            conn.commit()
+        row = (
+            trace_id,
+            provider,
+            model,
+            request_trunc,
+            response_trunc,
+            duration_ms,
+            _iso_now(),
+            json.dumps(tokens or {}, ensure_ascii=False),
+        )
+        if self._bulk_depth:
+            self._trace_buffer.append(row)
+            return trace_id
+        with self._transaction() as conn:
+            conn.execute(_INSERT_TRACE, row)
         return trace_id
 
+    @contextmanager
+    def bulk(self) -> Iterator[None]:
+        """Buffer trace rows and write them in one transaction on exit.
+
+        Safe to nest; rows are flushed when the outermost block exits.
+        """
+
+        self._bulk_depth += 1
+        try:
+            yield
+        finally:
+            self._bulk_depth -= 1
+            if not self._bulk_depth and self._trace_buffer:
+                rows, self._trace_buffer = self._trace_buffer, []
+                with self._transaction() as conn:
+                    conn.executemany(_INSERT_TRACE, rows)
+
 
 def default_state_store(base_dir: Path) -> StateStore:
     """Return a state store located under ``base_dir``."""
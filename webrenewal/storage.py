@@ -3,8 +3,9 @@
 from __future__ import annotations
 
 import logging
+import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 from .models import Serializable
 from .tracing import log_event
@@ -61,14 +62,30 @@ def write_text(content: str, filename: str) -> Path:
     return path
 
 
+def _scandir_files(root: Path, prefix: str = "") -> Iterator[str]:
+    """Yield relative POSIX paths of the files below ``root``.
+
+    ``os.scandir`` entries carry their file type from the directory listing,
+    so unlike ``rglob`` plus ``is_file`` no extra ``stat`` is needed per entry.
+    Directory symlinks are not followed, matching ``rglob``.
+    """
+
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                relative = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scandir_files(Path(entry.path), f"{relative}/")
+                elif entry.is_file():
+                    yield relative
+    except (FileNotFoundError, PermissionError):
+        return
+
+
 def list_files(directory: Path) -> list[str]:
     """Return a sorted list of relative file paths inside ``directory``."""
 
-    files: list[str] = []
-    for item in directory.rglob("*"):
-        if item.is_file():
-            files.append(str(item.relative_to(directory)))
-    return sorted(files)
+    return sorted(_scandir_files(directory))
 
 
 __all__ = ["write_json", "write_text", "SANDBOX_DIR", "list_files"]
@@ -7,11 +7,20 @@ import logging
 import math
 import time
 from contextlib import contextmanager
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Dict, Optional
+
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover - fallback when dependency missing
+    orjson = None  # type: ignore[assignment]
 
 __all__ = ["TraceSpan", "trace", "log_event", "safe_json"]
 
+# Value types that need no conversion at all; floats are excluded because NaN
+# and infinity have to be rewritten.
+_PLAIN_TYPES = (str, int, bool, type(None))
+
 
 def safe_json(value: Any) -> Any:
     """Return ``value`` converted into a JSON-serialisable structure."""
@@ -25,16 +34,19 @@ def safe_json(value: Any) -> Any:
         return [safe_json(item) for item in value]
 
     if isinstance(value, dict):
+        if all(type(key) is str and type(val) in _PLAIN_TYPES for key, val in value.items()):
+            # Flat mapping of primitives: already serialisable as-is.
+            return value
         return {str(key): safe_json(val) for key, val in value.items()}
 
-    if hasattr(value, "to_dict") and callable(getattr(value, "to_dict")):
+    if callable(to_dict := getattr(value, "to_dict", None)):
         try:
-            return value.to_dict()
+            return to_dict()
         except Exception:  # pragma: no cover - defensive serialisation
             return repr(value)
 
-    if hasattr(value, "__dict__"):
-        return {key: safe_json(val) for key, val in vars(value).items() if not key.startswith("_")}
+    if (attributes := getattr(value, "__dict__", None)) is not None:
+        return {key: safe_json(val) for key, val in attributes.items() if not key.startswith("_")}
 
     return repr(value)
 
@@ -49,12 +61,27 @@ def log_event(
 ) -> None:
     """Emit a structured log line encoded as JSON."""
 
+    if not logger.isEnabledFor(level):
+        # Filtered out anyway; skip building and encoding the payload.
+        return
     payload: Dict[str, Any] = {"event": event}
     if fields:
         payload.update({key: safe_json(value) for key, value in fields.items() if value is not None})
 
-    message = json.dumps(payload, ensure_ascii=False, sort_keys=True)
-    logger.log(level, message, exc_info=exc_info)
+    logger.log(level, _encode(payload), exc_info=exc_info)
+
+
+def _encode(payload: Dict[str, Any]) -> str:
+    """Encode a log payload as compact JSON with sorted keys."""
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+            ).decode("utf-8")
+        except TypeError:  # pragma: no cover - e.g. integers beyond 64 bit
+            pass
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
 
 
 @dataclass
@@ -64,38 +91,60 @@ class TraceSpan:
     name: str
     logger: logging.Logger
     fields: Dict[str, Any]
-    start_time: float
+    start_time: int  # time.perf_counter_ns() at span start
+    base_fields: Dict[str, Any] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Static span metadata is built once instead of on every note/exit.
+        self.base_fields = {"trace": self.name, **self.fields}
 
     def note(self, **fields: Any) -> None:
         """Emit an in-span structured debug note."""
 
-        base = {"trace": self.name}
-        base.update(self.fields)
-        base.update(fields)
-        log_event(self.logger, logging.DEBUG, "trace.note", **base)
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        log_event(self.logger, logging.DEBUG, "trace.note", **{**self.base_fields, **fields})
+
+    def child(self, name: str, **fields: Any) -> ContextManager[TraceSpan]:
+        """Open a nested span that shares this span's logger and metadata."""
+
+        return trace(name, logger=self.logger, parent=self, **fields)
 
 
 @contextmanager
-def trace(name: str, *, logger: Optional[logging.Logger] = None, **fields: Any):
-    """Context manager that logs start/end events with duration and exceptions."""
+def trace(
+    name: str,
+    *,
+    logger: Optional[logging.Logger] = None,
+    parent: Optional[TraceSpan] = None,
+    **fields: Any,
+):
+    """Context manager that logs start/end events with duration and exceptions.
+
+    When ``parent`` is given the span inherits the parent's logger and fields
+    and records the parent name, so stages can be grouped under a root span.
+    """
 
+    if parent is not None:
+        logger = logger or parent.logger
+        fields = {**parent.fields, "parent": parent.name, **fields}
     logger = logger or logging.getLogger("trace")
-    start_time = time.perf_counter()
-    base_fields = {"trace": name}
-    base_fields.update(fields)
+    start_time = time.perf_counter_ns()
+    span = TraceSpan(name=name, logger=logger, fields=fields, start_time=start_time)
+    base_fields = span.base_fields
     log_event(logger, logging.INFO, "trace.start", **base_fields)
-    span = TraceSpan(name=name, logger=logger, fields=dict(fields), start_time=start_time)
     try:
         yield span
     except Exception as exc:  # pragma: no cover - exercised via runtime failures
-        duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
-        error_fields = dict(base_fields)
-        error_fields["duration_ms"] = duration_ms
-        error_fields["error"] = repr(exc)
-        log_event(logger, logging.ERROR, "trace.error", exc_info=True, **error_fields)
+        duration_ms = (time.perf_counter_ns() - start_time) // 1_000_000
+        log_event(
+            logger,
+            logging.ERROR,
+            "trace.error",
+            exc_info=True,
+            **{**base_fields, "duration_ms": duration_ms, "error": repr(exc)},
+        )
         raise
     else:
-        duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
-        end_fields = dict(base_fields)
-        end_fields["duration_ms"] = duration_ms
-        log_event(logger, logging.INFO, "trace.end", **end_fields)
+        duration_ms = (time.perf_counter_ns() - start_time) // 1_000_000
+        log_event(logger, logging.INFO, "trace.end", **{**base_fields, "duration_ms": duration_ms})
@@ -3,9 +3,13 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 
+_SPLIT_RE = re.compile(r"[.-]")
 
+
+@lru_cache(maxsize=4096)
 def normalise_domain(domain: str) -> str:
     """Return a lowercase host name without protocol or path segments."""
 
@@ -17,6 +21,7 @@ def normalise_domain(domain: str) -> str:
     return host.rstrip("/")
 
 
+@lru_cache(maxsize=4096)
 def domain_to_display_name(domain: str) -> str:
     """Generate a human-friendly label derived from ``domain``."""
 
@@ -24,7 +29,7 @@ def domain_to_display_name(domain: str) -> str:
     if not host:
         return domain.strip()
 
-    parts = [segment for segment in re.split(r"[.-]", host) if segment]
+    parts = [segment for segment in _SPLIT_RE.split(host) if segment]
     if not parts:
         return host
 
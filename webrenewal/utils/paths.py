@@ -3,16 +3,20 @@
 from __future__ import annotations
 
 import hashlib
+from functools import lru_cache
 from pathlib import Path
 from urllib.parse import urlparse, unquote
 
 
+@lru_cache(maxsize=4096)
 def url_to_relative_path(url: str) -> Path:
     """Convert a page URL to a relative ``Path`` suitable for the sandbox.
 
     The function keeps the original hierarchy and ensures a concrete filename,
     normalising directories to ``index.html`` and appending a short hash when a
-    query string is present to avoid collisions.
+    query string is present to avoid collisions. Results are memoised because
+    the same URLs are resolved repeatedly across pipeline stages; the returned
+    ``Path`` is immutable and therefore safe to share between callers.
     """
 
     parsed = urlparse(url)
@@ -25,7 +29,7 @@ def url_to_relative_path(url: str) -> Path:
     path = path.lstrip("/") or "index.html"
 
     if parsed.query:
-        digest = hashlib.sha1(parsed.query.encode("utf-8")).hexdigest()[:8]
+        digest = hashlib.blake2b(parsed.query.encode("utf-8"), digest_size=4).hexdigest()
         stem_path = Path(path)
         suffix = stem_path.suffix or ".html"
         stem = stem_path.stem or "index"